@@ -4,11 +4,11 @@
 import io
 import time
 import threading
+from functools import lru_cache
 from typing import Optional
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
 from luma.core.interface.serial import i2c
 from luma.oled.device import sh1106
-from luma.core.render import canvas
 import paho.mqtt.client as mqtt
 
 # Config
@@ -26,17 +26,59 @@ MQTT_TOPIC_BASE = "iotstack/shairport"
 # Cover size options - try different sizes!
 COVER_SIZE = 48  # 32, 48, or 64
 
+# Resize filter - None picks BOX for >=4x downscale, BILINEAR otherwise
+COVER_RESAMPLE: Optional[Image.Resampling] = None
+
+# Number of processed covers kept around (albums cycling back and forth)
+COVER_CACHE_SIZE = 4
+
 # Display timeout
 DISPLAY_TIMEOUT = 5 * 60  # 5 minutes in seconds
 
 
+@lru_cache(maxsize=COVER_CACHE_SIZE)
+def process_cover(payload: bytes) -> Image.Image:
+    """Decode a JPEG cover into a dithered 1-bit square image.
+
+    Cached by payload, so retransmits of the same cover (resume, reconnect)
+    return the already processed image.
+    """
+    # Load JPEG from binary data
+    img = Image.open(io.BytesIO(payload))
+    print(f"  Original size: {img.size}, mode: {img.mode}")
+
+    # Let the JPEG decoder downscale (1/2, 1/4, 1/8) while decoding
+    img.draft("L", (COVER_SIZE * 2, COVER_SIZE * 2))
+
+    # Convert to grayscale
+    img = img.convert("L")
+
+    # Resize to square (crop center if needed)
+    min_dim = min(img.size)
+    left = (img.width - min_dim) // 2
+    top = (img.height - min_dim) // 2
+    img = img.crop((left, top, left + min_dim, top + min_dim))
+
+    # Resize to target size
+    resample = COVER_RESAMPLE
+    if resample is None:
+        resample = Image.Resampling.BOX if min_dim >= COVER_SIZE * 4 else Image.Resampling.BILINEAR
+    img = img.resize((COVER_SIZE, COVER_SIZE), resample)
+
+    # Convert to 1-bit with dithering (Floyd-Steinberg)
+    img = img.convert("1")  # Uses dithering by default
+
+    print(f"  Processed: {img.size}, mode: {img.mode}")
+    return img
+
+
 class CoverTest:
     def __init__(self):
         self.cover_image: Optional[Image.Image] = None
-        self.title: Optional[str] = None
-        self.artist: Optional[str] = None
-        self.last_activity: float = time.time()  # Track last playback activity
-        self._lock = threading.Lock()
+        # (artist, title, last_activity) replaced as a whole so readers need no lock
+        self._state: tuple[Optional[str], Optional[str], float] = (None, None, time.time())
+        self._lock = threading.Lock()  # Serializes read-modify-write updates of _state
+        self._dirty = threading.Event()  # Set whenever the display needs a redraw
 
         self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
         self.client.username_pw_set(MQTT_USER, MQTT_PASS)
@@ -59,47 +101,32 @@ class CoverTest:
         if topic == f"{MQTT_TOPIC_BASE}/cover":
             print(f"Received cover: {len(msg.payload)} bytes")
             try:
-                # Load JPEG from binary data
-                img = Image.open(io.BytesIO(msg.payload))
-                print(f"  Original size: {img.size}, mode: {img.mode}")
-
-                # Convert to grayscale
-                img = img.convert("L")
-
-                # Resize to square (crop center if needed)
-                min_dim = min(img.size)
-                left = (img.width - min_dim) // 2
-                top = (img.height - min_dim) // 2
-                img = img.crop((left, top, left + min_dim, top + min_dim))
-
-                # Resize to target size
-                img = img.resize((COVER_SIZE, COVER_SIZE), Image.Resampling.LANCZOS)
-
-                # Convert to 1-bit with dithering (Floyd-Steinberg)
-                img = img.convert("1")  # Uses dithering by default
-
-                print(f"  Processed: {img.size}, mode: {img.mode}")
-
-                with self._lock:
-                    self.cover_image = img
+                img = process_cover(msg.payload)
+                self.cover_image = img
+                self._dirty.set()
 
             except Exception as e:
                 print(f"  Error processing cover: {e}")
 
         elif topic == f"{MQTT_TOPIC_BASE}/title":
+            title = msg.payload.decode("utf-8", errors="ignore").strip()
             with self._lock:
-                self.title = msg.payload.decode("utf-8", errors="ignore").strip()
-            print(f"Title: {self.title}")
+                artist, _, last_activity = self._state
+                self._state = (artist, title, last_activity)
+            self._dirty.set()
+            print(f"Title: {title}")
 
         elif topic == f"{MQTT_TOPIC_BASE}/artist":
+            artist = msg.payload.decode("utf-8", errors="ignore").strip()
             with self._lock:
-                self.artist = msg.payload.decode("utf-8", errors="ignore").strip()
-                self.last_activity = time.time()
-            print(f"Artist: {self.artist}")
+                _, title, _ = self._state
+                self._state = (artist, title, time.time())
+            self._dirty.set()
+            print(f"Artist: {artist}")
 
         elif topic in [f"{MQTT_TOPIC_BASE}/play_start", f"{MQTT_TOPIC_BASE}/play_resume"]:
-            with self._lock:
-                self.last_activity = time.time()
+            self.reset_activity()
+            self._dirty.set()
             print("Playback started/resumed")
 
         elif topic == f"{MQTT_TOPIC_BASE}/play_end":
@@ -113,23 +140,31 @@ class CoverTest:
         self.client.loop_stop()
         self.client.disconnect()
 
+    def wait_for_update(self, timeout: float) -> bool:
+        """Block until new data arrived or timeout expired. Returns True on update."""
+        updated = self._dirty.wait(timeout)
+        if updated:
+            # Clearing after a timeout could swallow a set() that raced in
+            self._dirty.clear()
+        return updated
+
     def get_cover(self) -> Optional[Image.Image]:
-        with self._lock:
-            return self.cover_image
+        return self.cover_image
 
     def get_info(self) -> tuple[Optional[str], Optional[str]]:
-        with self._lock:
-            return self.artist, self.title
+        artist, title, _ = self._state
+        return artist, title
 
     def is_timed_out(self) -> bool:
         """Check if display should be turned off due to inactivity."""
-        with self._lock:
-            return (time.time() - self.last_activity) > DISPLAY_TIMEOUT
+        _, _, last_activity = self._state
+        return (time.time() - last_activity) > DISPLAY_TIMEOUT
 
     def reset_activity(self):
         """Reset the activity timer."""
         with self._lock:
-            self.last_activity = time.time()
+            artist, title, _ = self._state
+            self._state = (artist, title, time.time())
 
 
 def main():
@@ -144,15 +179,20 @@ def main():
     print(f"\nWaiting for cover art... (Cover size: {COVER_SIZE}x{COVER_SIZE})")
     print("Play a song to see the cover!\n")
 
-    last_cover = None
-    last_artist = None
-    last_title = None
     display_is_off = False
+    needs_redraw = True  # Draw the waiting screen right away
+
+    # Scratch frame reused for the waiting screen
+    scratch = Image.new("1", (WIDTH, HEIGHT), 0)
+    scratch_draw = ImageDraw.Draw(scratch)
+    layout = LeftLayout()
+    last_frame: Optional[bytes] = None
 
     try:
         while True:
-            cover = cover_test.get_cover()
-            artist, title = cover_test.get_info()
+            # Sleep until MQTT data arrives; the timeout keeps the inactivity check going
+            if cover_test.wait_for_update(timeout=1.0):
+                needs_redraw = True
             timed_out = cover_test.is_timed_out()
 
             # Handle display timeout
@@ -166,20 +206,23 @@ def main():
                 print("Display turned on")
 
             # Only redraw when something changed and display is on
-            if not display_is_off and (cover != last_cover or artist != last_artist or title != last_title):
-                last_cover = cover
-                last_artist = artist
-                last_title = title
+            if not display_is_off and needs_redraw:
+                needs_redraw = False
+                cover = cover_test.get_cover()
+                artist, title = cover_test.get_info()
 
                 if cover:
-                    # Create and display the layout directly (not inside canvas)
-                    img = create_layout_left(cover, artist, title)
-                    device.display(img)
+                    img = layout.render(cover, artist, title)
                 else:
-                    with canvas(device) as draw:
-                        draw.text((10, HEIGHT//2 - 5), "Waiting for cover...", fill=255)
+                    scratch_draw.rectangle((0, 0, WIDTH, HEIGHT), fill=0)
+                    scratch_draw.text((10, HEIGHT//2 - 5), "Waiting for cover...", fill=255)
+                    img = scratch
 
-            time.sleep(0.1)
+                # Skip the I2C transfer if the frame is identical to what is shown
+                frame_bytes = img.tobytes()
+                if frame_bytes != last_frame:
+                    device.display(img)
+                    last_frame = frame_bytes
 
     except KeyboardInterrupt:
         pass
@@ -187,43 +230,49 @@ def main():
         cover_test.stop()
 
 
-def create_layout_left(cover: Image.Image, artist: Optional[str], title: Optional[str]) -> Image.Image:
-    """Create layout with cover on left, text on right."""
-    from PIL import ImageDraw, ImageFont
-
-    # Create full-screen image
-    img = Image.new("1", (WIDTH, HEIGHT), 0)
-    draw = ImageDraw.Draw(img)
-
-    # Paste cover on left
-    img.paste(cover, (0, (HEIGHT - COVER_SIZE) // 2))
-
-    # Text area starts after cover
-    text_x = COVER_SIZE + 4
-    text_width = WIDTH - text_x
+class LeftLayout:
+    """Layout with cover on left, text on right, drawn into one persistent frame."""
 
-    # Try to load font, fallback to default
-    try:
-        from pathlib import Path
-        font_path = Path(__file__).parent / "fonts/PixelOperator.ttf"
-        font_small = ImageFont.truetype(str(font_path), 12)
-        font_large = ImageFont.truetype(str(font_path), 14)
-    except:
-        font_small = ImageFont.load_default()
-        font_large = font_small
-
-    # Draw artist (smaller, top)
-    if artist:
-        # Truncate if too long
-        display_artist = artist[:12] + "..." if len(artist) > 15 else artist
-        draw.text((text_x, 8), display_artist, font=font_small, fill=255)
-
-    # Draw title (larger, bottom)
-    if title:
-        display_title = title[:12] + "..." if len(title) > 15 else title
-        draw.text((text_x, 28), display_title, font=font_large, fill=255)
-
-    return img
+    def __init__(self):
+        self.img = Image.new("1", (WIDTH, HEIGHT), 0)
+        self.draw = ImageDraw.Draw(self.img)
+        self._cover: Optional[Image.Image] = None
+
+        # Text area starts after cover
+        self.text_x = COVER_SIZE + 4
+
+        # Try to load font, fallback to default
+        try:
+            from pathlib import Path
+            font_path = Path(__file__).parent / "fonts/PixelOperator.ttf"
+            self.font_small = ImageFont.truetype(str(font_path), 12)
+            self.font_large = ImageFont.truetype(str(font_path), 14)
+        except:
+            self.font_small = ImageFont.load_default()
+            self.font_large = self.font_small
+
+    def render(self, cover: Image.Image, artist: Optional[str], title: Optional[str]) -> Image.Image:
+        if cover is not self._cover:
+            # New cover: clear everything and paste it on the left
+            self.draw.rectangle((0, 0, WIDTH, HEIGHT), fill=0)
+            self.img.paste(cover, (0, (HEIGHT - COVER_SIZE) // 2))
+            self._cover = cover
+        else:
+            # Same cover: only the text area needs repainting
+            self.draw.rectangle((self.text_x, 0, WIDTH, HEIGHT), fill=0)
+
+        # Draw artist (smaller, top)
+        if artist:
+            # Truncate if too long
+            display_artist = artist[:12] + "..." if len(artist) > 15 else artist
+            self.draw.text((self.text_x, 8), display_artist, font=self.font_small, fill=255)
+
+        # Draw title (larger, bottom)
+        if title:
+            display_title = title[:12] + "..." if len(title) > 15 else title
+            self.draw.text((self.text_x, 28), display_title, font=self.font_large, fill=255)
+
+        return self.img
 
 
 if __name__ == "__main__":
@@ -2,11 +2,14 @@
 """MQTT shairport forwarder with retain=True and cover conversion."""
 
 import argparse
+import hashlib
 import io
 import os
 import sys
+from functools import lru_cache
 from typing import Optional
 
+import numpy as np
 from PIL import Image
 import paho.mqtt.client as mqtt
 
@@ -19,16 +22,36 @@ DEFAULT_PASS = os.getenv("MQTT_PASS", "")
 DEFAULT_TOPIC_IN = os.getenv("MQTT_TOPIC_IN", "iotstack/shairport/#")
 DEFAULT_TOPIC_OUT = os.getenv("MQTT_TOPIC_OUT", "iotstack/shairport-extension")
 DEFAULT_SIZE = 48
+DEFAULT_RESAMPLE = os.getenv("COVER_RESAMPLE", "auto")
+COVER_CACHE_SIZE = 4
+# Maps each byte to its bit-reversed value (MSB-first <-> LSB-first)
+_BITREVERSE_LUT = np.array([int(f"{i:08b}"[::-1], 2) for i in range(256)], dtype=np.uint8)
+
+# Event topics (play_start, active_end, ...) start a new session, after which covers are republished
+EVENT_PREFIXES = ("play_", "active_")
+
+RESAMPLE_FILTERS = {
+    "box": Image.Resampling.BOX,
+    "bilinear": Image.Resampling.BILINEAR,
+    "lanczos": Image.Resampling.LANCZOS,
+}
 
 
 class CoverTranslator:
     def __init__(self, args: argparse.Namespace) -> None:
         self.args = args
+        # Retained covers get re-sent on every reconnect; skip reconverting them
+        self._convert_cover = lru_cache(maxsize=COVER_CACHE_SIZE)(self._convert_cover)
+        # Digest of the last published cover. Only covers are de-duplicated: the ESP32
+        # treats every title/artist message as an activity keepalive.
+        self._last_cover: Optional[bytes] = None
         self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
         if args.user:
             self.client.username_pw_set(args.user, args.password)
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
+        self.client.max_inflight_messages_set(20)
+        self.client.max_queued_messages_set(0)  # 0 = unbounded
 
     def _on_connect(self, client, userdata, flags, reason_code, properties):
         print(f"Connected: {reason_code}")
@@ -44,30 +67,41 @@ class CoverTranslator:
         subtopic = msg.topic[len(topic_in_base) + 1:]
         new_topic = f"{self.args.topic_out}/{subtopic}"
 
+        if subtopic.startswith(EVENT_PREFIXES):
+            self._last_cover = None
+
         # Special handling for cover: convert to bitmap and publish as cover_mono
         if subtopic == "cover":
             payload = msg.payload
+            # Skip repeats within a session (e.g. retained cover replayed on reconnect)
+            digest = hashlib.blake2b(payload, digest_size=16).digest()
+            if digest == self._last_cover:
+                return
             if payload == b"--":
                 mono_topic = f"{self.args.topic_out}/cover_mono"
-                client.publish(mono_topic, payload, retain=True)
+                client.publish(mono_topic, payload, qos=0, retain=True)
+                self._last_cover = digest
                 print(f"Published empty cover to {mono_topic}")
                 return
 
             try:
                 bitmap = self._convert_cover(payload)
                 mono_topic = f"{self.args.topic_out}/cover_mono"
-                client.publish(mono_topic, bitmap, retain=True)
+                client.publish(mono_topic, bitmap, qos=0, retain=True)
+                self._last_cover = digest
                 print(f"Published {len(bitmap)} bytes (converted cover) to {mono_topic}")
             except Exception as exc:
                 print(f"Convert error: {exc}")
             return
 
         # For all other topics: forward as-is with retain=True
-        client.publish(new_topic, msg.payload, retain=True)
+        client.publish(new_topic, msg.payload, qos=0, retain=True)
         print(f"Forwarded to {new_topic} (retain=True)")
 
     def _convert_cover(self, payload: bytes) -> bytes:
         img = Image.open(io.BytesIO(payload))
+        # JPEG draft mode decodes directly at a reduced scale
+        img.draft("L", (self.args.size * 2, self.args.size * 2))
         img = img.convert("L")
 
         # center-crop to square like test_cover.py
@@ -76,19 +110,23 @@ class CoverTranslator:
         top = (img.height - min_dim) // 2
         img = img.crop((left, top, left + min_dim, top + min_dim))
 
-        img = img.resize((self.args.size, self.args.size), Image.Resampling.LANCZOS)
+        img = img.resize((self.args.size, self.args.size), self._resample_filter(min_dim))
         img = img.convert("1")  # Floyd-Steinberg dithering by default
 
         # Pack to XBM (LSB first) rows
-        pixels = img.load()
-        width, height = img.size
-        out = bytearray((width * height + 7) // 8)
-        for y in range(height):
-            for x in range(width):
-                if pixels[x, y] != 0:
-                    idx = y * width + x
-                    out[idx >> 3] |= 1 << (idx & 7)
-        return bytes(out)
+        if img.width % 8 == 0:
+            # Mode "1" is already packed MSB first without row padding, just flip each byte
+            return _BITREVERSE_LUT[np.frombuffer(img.tobytes(), dtype=np.uint8)].tobytes()
+        bits = np.asarray(img, dtype=np.uint8).reshape(-1)
+        return np.packbits(bits, bitorder="little").tobytes()
+
+    def _resample_filter(self, src_size: int) -> Image.Resampling:
+        if self.args.resample != "auto":
+            return RESAMPLE_FILTERS[self.args.resample]
+        # BOX is plenty for heavy downscales once the result gets dithered to 1-bit
+        if src_size >= self.args.size * 4:
+            return Image.Resampling.BOX
+        return Image.Resampling.BILINEAR
 
     def run(self) -> None:
         self.client.connect(self.args.host, self.args.port, keepalive=60)
@@ -104,7 +142,12 @@ def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
     parser.add_argument("--topic-in", default=DEFAULT_TOPIC_IN)
     parser.add_argument("--topic-out", default=DEFAULT_TOPIC_OUT)
     parser.add_argument("--size", type=int, default=DEFAULT_SIZE)
-    return parser.parse_args(argv)
+    parser.add_argument("--resample", type=str.lower, choices=["auto", *RESAMPLE_FILTERS], default=DEFAULT_RESAMPLE)
+    args = parser.parse_args(argv)
+    # argparse doesn't check choices for defaults, so validate COVER_RESAMPLE here
+    if args.resample not in ("auto", *RESAMPLE_FILTERS):
+        parser.error(f"invalid COVER_RESAMPLE {args.resample!r} (choose from auto, {', '.join(RESAMPLE_FILTERS)})")
+    return args
 
 
 def main() -> int:
@@ -3,19 +3,20 @@
 import os
 import time
 import threading
-from random import randrange
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Any
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from luma.core.interface.serial import i2c
 from luma.oled.device import sh1106
-from luma.core.render import canvas
 import paho.mqtt.client as mqtt
 
 I2C_PORT = 1
 I2C_ADDR = 0x3C
 WIDTH, HEIGHT = 128, 64
 ROTATE = 2
+PAGE_ADDRESS_OFFSET = 0x02  # SH1106 RAM is 132 columns wide, the panel starts at column 2
 
 FONT_FILENAME = "fonts/PixelOperator.ttf"
 FONT_SIZE = 16
@@ -26,15 +27,18 @@ MQTT_USER = os.getenv("MQTT_USER", "")
 MQTT_PASS = os.getenv("MQTT_PASS", "")
 MQTT_TOPIC_BASE = os.getenv("MQTT_TOPIC_BASE", "iotstack/shairport")
 
-FPS = 30
+FPS = 30  # While the title scrolls
+FPS_STATIC_TITLE = 15
+FPS_IDLE = 20
 SCROLL_SPEED = 2
 SCROLL_DELAY = 2.0
 GAP_PX = 32
 
 STAR_NUM = 512
 STAR_MAX_DEPTH = 32
-STAR_Z_STEP = 0.2
+STAR_Z_STEP = 0.2  # Per frame at FPS, scaled at lower frame rates
 STAR_VIEW_Y_OFFSET = 15
+STAR_RNG_SIZE = 8192  # Pre-drawn random star offsets, refilled when used up
 
 
 def get_font(path: Path, size: int) -> Any:
@@ -44,10 +48,13 @@ def get_font(path: Path, size: int) -> Any:
         return ImageFont.load_default()
 
 
+# Shared 1-bit draw context used only for text measurement
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("1", (1, 1)))
+
+
+@lru_cache(maxsize=32)
 def get_text_width(font: Any, text: str) -> int:
-    tmp = Image.new("1", (1, 1))
-    d = ImageDraw.Draw(tmp)
-    bbox = d.textbbox((0, 0), text, font=font)
+    bbox = _MEASURE_DRAW.textbbox((0, 0), text, font=font)
     return int(bbox[2] - bbox[0])
 
 
@@ -63,9 +70,12 @@ class ShairportMQTTClient:
         self.client.on_message = self._on_message
         self.client.on_disconnect = self._on_disconnect
 
+        # The lock only serializes writers; readers pick up the plain attribute
+        # references below, which CPython swaps atomically
         self._lock = threading.Lock()
         self._title: Optional[str] = None
         self._artist: Optional[str] = None
+        self._display_title: Optional[str] = None
         self._is_active: bool = False
         self._connected: bool = False
 
@@ -88,17 +98,29 @@ class ShairportMQTTClient:
         print(f"MQTT disconnected with result code {reason_code}")
         self._connected = False
 
+    @staticmethod
+    def _parse_text(payload: bytes) -> Optional[str]:
+        if payload in (b"", b"--"):
+            return None
+        text = payload.decode("utf-8", errors="ignore").strip()
+        return text if text and text != "--" else None
+
     def _on_message(self, client, userdata, msg):
         topic = msg.topic
-        payload = msg.payload.decode("utf-8", errors="ignore").strip()
 
-        print(f"MQTT: {topic} = {payload[:50] if payload else '(empty)'}")
+        # Only title and artist carry text, the other topics are plain events
+        if topic in (f"{self.topic_base}/title", f"{self.topic_base}/artist"):
+            text = self._parse_text(msg.payload)
+            print(f"MQTT: {topic} = {text[:50] if text else '(empty)'}")
+        else:
+            text = None
+            print(f"MQTT: {topic}")
 
         with self._lock:
             if topic == f"{self.topic_base}/title":
-                self._title = payload if payload and payload != "--" else None
+                self._title = text
             elif topic == f"{self.topic_base}/artist":
-                self._artist = payload if payload and payload != "--" else None
+                self._artist = text
             elif topic == f"{self.topic_base}/active_start":
                 self._is_active = True
             elif topic == f"{self.topic_base}/active_end":
@@ -109,6 +131,13 @@ class ShairportMQTTClient:
                 self._title = None
                 self._artist = None
 
+            if not self._title:
+                self._display_title = None
+            elif self._artist:
+                self._display_title = f"{self._artist} - {self._title}"
+            else:
+                self._display_title = self._title
+
     def start(self):
         try:
             self.client.connect(self.broker, self.port, keepalive=60)
@@ -121,16 +150,10 @@ class ShairportMQTTClient:
         self.client.disconnect()
 
     def is_active(self) -> bool:
-        with self._lock:
-            return self._is_active
+        return self._is_active
 
     def get_display_title(self) -> Optional[str]:
-        with self._lock:
-            if not self._title:
-                return None
-            if self._artist:
-                return f"{self._artist} - {self._title}"
-            return self._title
+        return self._display_title
 
 
 class Starfield:
@@ -139,7 +162,8 @@ class Starfield:
         self.height = height
         self.num_stars = num_stars
         self.max_depth = max_depth
-        self.stars = []
+        self._rng = np.random.default_rng()
+        self._refill_offsets()
         self.init_stars()
 
         self.vp_x = 0
@@ -150,10 +174,22 @@ class Starfield:
         self.origin_y = height // 2
 
     def init_stars(self):
-        self.stars = [
-            [float(randrange(-25, 25)), float(randrange(-25, 25)), float(randrange(1, self.max_depth))]
-            for _ in range(self.num_stars)
-        ]
+        # Star coordinates are stored column-wise so each frame is a few array ops
+        n = self.num_stars
+        self.star_x = self._rng.integers(-25, 25, n).astype(np.float64)
+        self.star_y = self._rng.integers(-25, 25, n).astype(np.float64)
+        self.star_z = self._rng.integers(1, self.max_depth, n).astype(np.float64)
+
+    def _refill_offsets(self):
+        self._offsets = self._rng.integers(-25, 25, STAR_RNG_SIZE).astype(np.float64)
+        self._offsets_pos = 0
+
+    def _take_offsets(self, n: int) -> np.ndarray:
+        if self._offsets_pos + n > STAR_RNG_SIZE:
+            self._refill_offsets()
+        out = self._offsets[self._offsets_pos:self._offsets_pos + n]
+        self._offsets_pos += n
+        return out
 
     def set_viewport(self, x: int, y: int, w: int, h: int):
         self.vp_x = x
@@ -163,22 +199,32 @@ class Starfield:
         self.origin_x = x + w // 2
         self.origin_y = y + h // 2
 
-    def update_and_draw(self, draw: ImageDraw.ImageDraw):
-        for star in self.stars:
-            star[2] -= STAR_Z_STEP
-            if star[2] <= 0:
-                star[0] = float(randrange(-25, 25))
-                star[1] = float(randrange(-25, 25))
-                star[2] = float(self.max_depth)
-
-            k = 128.0 / star[2]
-            x = int(star[0] * k + self.origin_x)
-            y = int(star[1] * k + self.origin_y)
-
-            if (self.vp_x <= x < self.vp_x + self.vp_w) and (self.vp_y <= y < self.vp_y + self.vp_h):
-                draw.point((x, y), fill=255)
-                if (1 - star[2] / self.max_depth) * 4 >= 2:
-                    draw.point((x + 1, y), fill=255)
+    def update_and_draw(self, fb: np.ndarray, z_step: float = STAR_Z_STEP):
+        """Advance the stars one step and set their pixels in a (height, width) framebuffer."""
+        self.star_z -= z_step
+        expired = self.star_z <= 0
+        n_expired = int(np.count_nonzero(expired))
+        if n_expired:
+            self.star_x[expired] = self._take_offsets(n_expired)
+            self.star_y[expired] = self._take_offsets(n_expired)
+            self.star_z[expired] = self.max_depth
+
+        # Stay in float until clipped: stars close to z=0 project far off-screen
+        k = 128.0 / self.star_z
+        x = np.trunc(self.star_x * k + self.origin_x)
+        y = np.trunc(self.star_y * k + self.origin_y)
+
+        visible = (
+            (x >= self.vp_x) & (x < self.vp_x + self.vp_w)
+            & (y >= self.vp_y) & (y < self.vp_y + self.vp_h)
+        )
+        x = x[visible].astype(np.int32)
+        y = y[visible].astype(np.int32)
+        fb[y, x] = 1
+
+        # Near stars are drawn two pixels wide
+        near = ((1 - self.star_z[visible] / self.max_depth) * 4 >= 2) & (x + 1 < self.width)
+        fb[y[near], x[near] + 1] = 1
 
 
 class TitleDisplay:
@@ -190,6 +236,7 @@ class TitleDisplay:
         self.is_scrolling = False
         self.scroll_offset = 0.0
         self.text_width = 0
+        self.surface: Optional[Image.Image] = None
         self.scroll_wait_start = 0.0
         self.waiting_to_scroll = False
 
@@ -219,6 +266,11 @@ class TitleDisplay:
             self.text_width = get_text_width(self.font, self.display_text)
             self.is_scrolling = True
 
+        # Rasterize the glyphs once; every frame just blits this surface
+        _, _, right, bottom = self.font.getbbox(self.display_text, mode="1")
+        self.surface = Image.new("1", (max(int(right), 1), max(int(bottom), 1)), 0)
+        ImageDraw.Draw(self.surface).text((0, 0), self.display_text, font=self.font, fill=1)
+
     def update(self):
         if not self.is_scrolling:
             return
@@ -235,20 +287,51 @@ class TitleDisplay:
             self.waiting_to_scroll = True
             self.scroll_wait_start = time.time()
 
-    def draw(self, draw: ImageDraw.ImageDraw, y: int):
+    def draw(self, img: Image.Image, y: int):
+        if self.surface is None:
+            return
+        # The surface doubles as its own mask so only lit pixels are copied
         if not self.is_scrolling:
             x = (self.width - self.text_width) // 2
-            draw.text((x, y), self.display_text, font=self.font, fill=255)
+            img.paste(self.surface, (x, y), self.surface)
         else:
             x = -int(self.scroll_offset)
-            draw.text((x, y), self.display_text, font=self.font, fill=255)
-            draw.text((x + self.text_width, y), self.display_text, font=self.font, fill=255)
+            img.paste(self.surface, (x, y), self.surface)
+            img.paste(self.surface, (x + self.text_width, y), self.surface)
+
+
+class PageDiffDisplay:
+    """Push only the SH1106 pages (8-pixel-tall stripes) that changed since the last frame."""
+
+    def __init__(self, device: sh1106):
+        self.device = device
+        self._pages: Optional[np.ndarray] = None
+
+    def display(self, img: Image.Image):
+        img = self.device.preprocess(img)
+        bits = np.asarray(img, dtype=np.uint8)
+        height, width = bits.shape
+
+        # SH1106 page layout: one byte per column, LSB is the top row of the page
+        pages = np.packbits(bits.reshape(height // 8, 8, width), axis=1, bitorder="little")
+        pages = pages.reshape(height // 8, width)
+
+        if self._pages is None:
+            changed = range(height // 8)
+        else:
+            changed = np.flatnonzero((pages != self._pages).any(axis=1))
+
+        for page in changed:
+            self.device.command(0xB0 + int(page), PAGE_ADDRESS_OFFSET, 0x10)
+            self.device.data(pages[page].tolist())
+        self._pages = pages
 
 
 def main():
     serial = i2c(port=I2C_PORT, address=I2C_ADDR)
-    device = sh1106(serial, width=WIDTH, height=HEIGHT, rotate=ROTATE)
+    device = sh1106(serial, width=WIDTH, height=HEIGHT, rotate=ROTATE, page_address_offset=PAGE_ADDRESS_OFFSET)
     device.contrast(255)
+    screen = PageDiffDisplay(device)
 
     font_path = Path(__file__).parent / FONT_FILENAME
     font = get_font(font_path, FONT_SIZE)
@@ -266,6 +349,8 @@ def main():
     title_display = TitleDisplay(WIDTH, font)
 
     title = None
+    fb = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    frame = Image.new("1", (WIDTH, HEIGHT), 0)
 
     try:
         while True:
@@ -280,14 +365,25 @@ def main():
             else:
                 starfield.set_viewport(0, 0, WIDTH, HEIGHT)
 
-            with canvas(device) as draw:
-                if title:
-                    title_display.draw(draw, y=0)
+            # Only scrolling needs the full frame rate, keep star speed constant otherwise
+            if title and title_display.is_scrolling:
+                target_fps = FPS
+            else:
+                target_fps = FPS_STATIC_TITLE if title else FPS_IDLE
+
+            # Stars go straight into a numpy framebuffer, packed into the reused frame in one go
+            fb.fill(0)
+            starfield.update_and_draw(fb, z_step=STAR_Z_STEP * FPS / target_fps)
+            frame.frombytes(np.packbits(fb, axis=1).tobytes())
+
+            if title:
+                title_display.draw(frame, y=0)
 
-                starfield.update_and_draw(draw)
+            # A full I2C push takes ~20 ms, only send the pages that changed
+            screen.display(frame)
 
             elapsed = time.time() - start_time
-            sleep_time = (1.0 / FPS) - elapsed
+            sleep_time = (1.0 / target_fps) - elapsed
             if sleep_time > 0:
                 time.sleep(sleep_time)
 